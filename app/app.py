@@ -1,53 +1,224 @@
-from data_fetcher import DataFetcher
-from recommendations import Recommendations
+import time
 
+_START = time.perf_counter()
 
-if __name__ == '__main__':
+import argparse
+import sys
 
-    file = '/Users/aggrom/Desktop/MSDS/5_Data_mining/Assignment_1/friend-recommender/data/facebook_combined.txt'
-    percentages = []
-    algo_list = ['common_neighbors', 'jaccard', 'adamic_adar', 'cosine']
 
-    fetcher = DataFetcher(file)
-    graph = fetcher.network_dict
+ALGO_LIST = ['common_neighbors', 'jaccard', 'adamic_adar', 'cosine']
+SNAPSHOT_EXTENSION = '.pkl'
 
-    recommender = Recommendations(graph)
 
-    recommender.compute_the_number_users_with_the_same_first_and_different_10_recommendations()
+class Timer:
+    """
+    Collects the duration of the named phases of a command, so that they can be reported with --timing
+    """
+
+    def __init__(self):
+        self.phases = list()
+
+    def measure(self, name, start):
+        self.phases.append((name, time.perf_counter() - start))
+
+    def report(self, stream=sys.stderr):
+        for name, seconds in self.phases:
+            print('{}: {:.2f} ms'.format(name, seconds * 1000), file=stream)
+        print('total: {:.2f} ms'.format((time.perf_counter() - _START) * 1000), file=stream)
+
+
+def load_graph(path, timer):
+    """
+    This method loads the friend dictionary either from a snapshot or from a raw edge file.
+    The heavy modules are only imported here, when a command actually needs them
+    :param path: str. the path of a snapshot (.pkl) or of an edge file
+    :param timer: Timer, that records the import and load time
+    :return: dict. of nodes with the set of nodes they are connected to
+    """
+    start = time.perf_counter()
+    from data_fetcher import DataFetcher
+    timer.measure('import data_fetcher', start)
+
+    start = time.perf_counter()
+    if path.endswith(SNAPSHOT_EXTENSION):
+        graph = DataFetcher.load_snapshot(path)
+    else:
+        graph = DataFetcher(path).network_dict
+    timer.measure('load graph', start)
+
+    return graph
+
+
+def create_recommender(graph, timer, number_of_suggestions=10):
+    start = time.perf_counter()
+    from recommendations import Recommendations
+    timer.measure('import recommendations', start)
+
+    return Recommendations(graph, number_of_suggestions=number_of_suggestions)
+
 
-    percentages.append(recommender.compute_similarity_percentage('common_neighbors', 'jaccard'))
-    percentages.append(recommender.compute_similarity_percentage('common_neighbors', 'adamic_adar'))
-    percentages.append(recommender.compute_similarity_percentage('jaccard', 'adamic_adar'))
-    percentages.append(recommender.compute_similarity_percentage('cosine', 'common_neighbors'))
-    percentages.append(recommender.compute_similarity_percentage('cosine', 'jaccard'))
-    percentages.append(recommender.compute_similarity_percentage('cosine', 'adamic_adar'))
+def build_snapshot(args, timer):
+    graph = load_graph(args.edges, timer)
 
-    total = 0
-    for percentage in percentages:
-        total = total + percentage
+    from data_fetcher import DataFetcher
+    start = time.perf_counter()
+    DataFetcher.save_snapshot(graph, args.snapshot)
+    timer.measure('save snapshot', start)
 
-    average_similarity = round((total/ len(percentages)), 2)
+    print('Snapshot with {} nodes saved to {}'.format(len(graph), args.snapshot))
+
+
+def recommend(args, timer):
+    graph = load_graph(args.graph, timer)
+    recommender = create_recommender(graph, timer, args.number)
+
+    for user in args.users:
+        if user not in graph:
+            print('Node {} is not part of the network'.format(user), file=sys.stderr)
+            continue
+
+        start = time.perf_counter()
+        suggestions = recommender.run_algorithm(user, args.score, limit=args.number)
+        timer.measure('recommend {}'.format(user), start)
+
+        print('Recommendations for node {}:'.format(user))
+        print(suggestions)
+
+
+def evaluate(args, timer):
+    graph = load_graph(args.graph, timer)
+    recommender = create_recommender(graph, timer)
+
+    start = time.perf_counter()
+    recommender.compute_the_number_users_with_the_same_first_and_different_10_recommendations()
+
+    percentages = list()
+    for i, method_a in enumerate(ALGO_LIST):
+        for method_b in ALGO_LIST[i + 1:]:
+            percentages.append(recommender.compute_similarity_percentage(method_a, method_b))
+
+    average_similarity = round((sum(percentages) / len(percentages)), 2)
     print('The average similarity between the algorithms is: ' + str(average_similarity))
-    
+
     recommender.evaluate_scoring_functions()
-    
-    for algo in algo_list:
-        print()
-        print()
-        print('Calculating {} score'.format(algo))
+    timer.measure('evaluate', start)
+
+
+def benchmark(args, timer):
+    graph = load_graph(args.graph, timer)
+    recommender = create_recommender(graph, timer, args.number)
+
+    for algo in args.scores:
+        start = time.perf_counter()
         recommender.find_recommendations(score=algo)
-        print()
-        print('Recommendations for node 107:')
-        print(recommender.recommendations['107'])
+        elapsed = time.perf_counter() - start
+        timer.measure('find_recommendations {}'.format(algo), start)
+
+        print('{}: {} nodes in {:.3f} s ({:.3f} ms/node)'.format(
+            algo, len(graph), elapsed, elapsed * 1000 / max(len(graph), 1)))
+
+
+def print_recommendations(node, suggestions):
+    print('{}\t{}'.format(node, suggestions), flush=True)
+
+
+def ingest(args, timer):
+    graph = load_graph(args.graph, timer)
+    recommender = create_recommender(graph, timer, args.number)
+
+    if args.save_recommendations:
+        # the saved table has to cover every user, not only the ones changed by the events
+        start = time.perf_counter()
+        recommender.find_recommendations(score=args.score)
+        timer.measure('find_recommendations {}'.format(args.score), start)
+
+    start = time.perf_counter()
+    from event_stream import EventIngestor, micro_batches, parse_events, read_lines
+    timer.measure('import event_stream', start)
+
+    start = time.perf_counter()
+    ingestor = EventIngestor(recommender, score=args.score, max_recompute=args.max_recompute,
+                             max_pending=args.max_pending)
+    lines = read_lines(args.events, follow=args.follow)
+    batches = micro_batches(parse_events(lines, ingestor.metrics), args.batch_size, args.window)
+    try:
+        ingestor.run(batches, report=lambda metrics: metrics.report(),
+                     emit=None if args.quiet else print_recommendations)
+    except KeyboardInterrupt:
+        pass
+    timer.measure('ingest', start)
+
+    if args.save:
+        from data_fetcher import DataFetcher
+        DataFetcher.save_snapshot(graph, args.save)
+
+    if args.save_recommendations:
+        recommender.recommendations.save(args.save_recommendations)
 
-        print('-'*10)
-        print('Recommendations for node 1126:')
-        print(recommender.recommendations['1126'])
 
-        print('-'*10)
-        print('Recommendations for node 14:')
-        print(recommender.recommendations['14'])
+def build_parser():
+    parser = argparse.ArgumentParser(description='Friend recommendations for a social network')
+    parser.add_argument('--timing', action='store_true',
+                        help='report import, load and execution time on stderr')
+    subparsers = parser.add_subparsers(dest='command', required=True)
 
-        print('-'*10)
-        print('Recommendations for node 35:')
-        print(recommender.recommendations['35'])
+    snapshot_parser = subparsers.add_parser('build-snapshot', aliases=['load'],
+                                            help='parse an edge file and store the friend dictionary')
+    snapshot_parser.add_argument('edges', help='path of the edge file')
+    snapshot_parser.add_argument('snapshot', help='path of the snapshot file ({})'.format(SNAPSHOT_EXTENSION))
+    snapshot_parser.set_defaults(func=build_snapshot)
+
+    recommend_parser = subparsers.add_parser('recommend', help='recommend friends for the given nodes')
+    recommend_parser.add_argument('graph', help='path of a snapshot or of an edge file')
+    recommend_parser.add_argument('users', nargs='+', help='ids of the nodes')
+    recommend_parser.add_argument('--score', choices=ALGO_LIST + ['baseline'], default='common_neighbors')
+    recommend_parser.add_argument('-n', '--number', type=int, default=10, help='number of suggestions')
+    recommend_parser.set_defaults(func=recommend)
+
+    evaluate_parser = subparsers.add_parser('evaluate', help='compare and evaluate the scoring functions')
+    evaluate_parser.add_argument('graph', help='path of a snapshot or of an edge file')
+    evaluate_parser.set_defaults(func=evaluate)
+
+    benchmark_parser = subparsers.add_parser('benchmark', help='time the recommendations for every node')
+    benchmark_parser.add_argument('graph', help='path of a snapshot or of an edge file')
+    benchmark_parser.add_argument('--scores', nargs='+', choices=ALGO_LIST + ['baseline'], default=ALGO_LIST)
+    benchmark_parser.add_argument('-n', '--number', type=int, default=10, help='number of suggestions')
+    benchmark_parser.set_defaults(func=benchmark)
+
+    ingest_parser = subparsers.add_parser('ingest', help='apply a stream of add/remove edge events')
+    ingest_parser.add_argument('graph', help='path of a snapshot or of an edge file')
+    ingest_parser.add_argument('events', nargs='?', default='-',
+                               help="path of the event file, '-' for stdin (default)")
+    ingest_parser.add_argument('--follow', action='store_true', help='keep tailing the event file')
+    ingest_parser.add_argument('--score', choices=ALGO_LIST + ['baseline'], default='common_neighbors')
+    ingest_parser.add_argument('-n', '--number', type=int, default=10, help='number of suggestions')
+    ingest_parser.add_argument('--batch-size', type=int, default=1000, help='maximum events per micro-batch')
+    ingest_parser.add_argument('--window', type=float, default=1.0, help='maximum seconds per micro-batch')
+    ingest_parser.add_argument('--max-recompute', type=int, default=1000,
+                               help='maximum users recomputed per micro-batch')
+    ingest_parser.add_argument('--max-pending', type=int, default=10000,
+                               help='pending users above which reading pauses')
+    ingest_parser.add_argument('--save', help='path of a snapshot to store the updated graph')
+    ingest_parser.add_argument('--save-recommendations',
+                               help='path of a file to store the recommendations of every user, '
+                                    'computed before the events are applied and kept up to date')
+    ingest_parser.add_argument('-q', '--quiet', action='store_true',
+                               help='do not print the recomputed recommendations on stdout')
+    ingest_parser.set_defaults(func=ingest)
+
+    return parser
+
+
+def main(argv=None):
+    timer = Timer()
+    timer.measure('startup', _START)
+
+    args = build_parser().parse_args(argv)
+    args.func(args, timer)
+
+    if args.timing:
+        timer.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,4 @@
-from pprint import pprint
-import networkx as nx
-import json
+import pickle
 
 
 class DataFetcher:
@@ -55,14 +53,6 @@ class DataFetcher:
 
         return directed_graph + undirected_graph
 
-        # d_graph = nx.Graph()
-        # for element in directed_graph:
-        #     d_graph.add_path(element)
-        #
-        # undirected_graph = d_graph.to_undirected()
-        #
-        # return nx.edges(undirected_graph)
-
     @staticmethod
     def create_friend_dict(undirected_graph):
         """
@@ -84,11 +74,36 @@ class DataFetcher:
 
     @staticmethod
     def save_network_to_file(network, file_name):
+        import json
+
         with open(file_name, 'w') as fp:
             json.dump(network, fp)
 
+    @staticmethod
+    def save_snapshot(network, file_name):
+        """
+        This method stores a prepared friend dictionary in a binary snapshot, so that it can be
+        loaded again without re-parsing the edge file
+        :param network: dict. of nodes with the set of nodes they are connected to
+        :param file_name: str. the path of the snapshot file
+        """
+        with open(file_name, 'wb') as fp:
+            pickle.dump(network, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load_snapshot(file_name):
+        """
+        This method loads a friend dictionary that was stored with save_snapshot
+        :param file_name: str. the path of the snapshot file
+        :return: a dictionary of nodes with a set of the nodes they are connected to
+        """
+        with open(file_name, 'rb') as fp:
+            return pickle.load(fp)
+
 
 if __name__ == '__main__':
+    from pprint import pprint
+
     file = '/Users/aggrom/Desktop/MSDS/5_Data_mining/Assignment_1/friend-recommender/data/facebook_combined.txt'
 
     data_obj = DataFetcher(file)
@@ -0,0 +1,277 @@
+from collections import OrderedDict
+import codecs
+import io
+import os
+import select
+import sys
+import time
+
+
+ADD = 'add'
+REMOVE = 'remove'
+# scores that are normalized by the degree of the candidate
+DEGREE_SENSITIVE_SCORES = ('jaccard', 'cosine')
+
+
+def read_stream(stream, poll_interval=0.5):
+    """
+    This method reads a pipe or terminal line by line until it is closed, yielding None whenever
+    nothing arrived within poll_interval. Streams that can not be polled are read as they are,
+    without idle markers
+    :param stream: file object, such as sys.stdin
+    :param poll_interval: float. seconds to wait for new data
+    :return: generator of lines
+    """
+    try:
+        fd = stream.fileno()
+        select.select([fd], [], [], 0)
+    except (OSError, ValueError, io.UnsupportedOperation):
+        yield from stream
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    while True:
+        ready, _, _ = select.select([fd], [], [], poll_interval)
+        if not ready:
+            yield None
+            continue
+
+        # read the descriptor directly, data kept in the buffer of stream would not wake up select
+        chunk = os.read(fd, 65536)
+        pending += decoder.decode(chunk, final=not chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+
+        if not chunk:
+            if pending:
+                yield pending
+            return
+
+
+def read_lines(path, follow=False, poll_interval=0.5):
+    """
+    This method reads an event file line by line, or stdin when the path is '-'. With follow it
+    keeps tailing the file and yields None whenever no new line arrived within poll_interval,
+    so that the stages downstream can close their windows while the stream is idle; stdin is
+    always polled that way
+    :param path: str. the path of the event file or '-'
+    :param follow: bool. whether to wait for new lines at the end of the file
+    :param poll_interval: float. seconds to sleep between checks for new lines
+    :return: generator of lines
+    """
+    if path == '-':
+        yield from read_stream(sys.stdin, poll_interval)
+        return
+
+    with open(path) as f:
+        pending = ''
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                if pending.endswith('\n'):
+                    yield pending
+                    pending = ''
+            elif follow:
+                yield None
+                time.sleep(poll_interval)
+            else:
+                if pending:
+                    yield pending
+                return
+
+
+def parse_events(lines, metrics=None):
+    """
+    This method parses lines of the form '<add|remove> <node> <node> [timestamp]' into events.
+    Malformed lines are counted and skipped, idle markers (None) are passed through
+    :param lines: iterable of lines
+    :param metrics: IngestionMetrics, that counts the malformed lines
+    :return: generator of (operation, node, node, timestamp) tuples
+    """
+    for line in lines:
+        if line is None:
+            yield None
+            continue
+
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+
+        try:
+            operation, node_a, node_b = fields[:3]
+            timestamp = float(fields[3]) if len(fields) > 3 else None
+        except ValueError:
+            operation = None
+
+        if operation not in (ADD, REMOVE) or node_a == node_b:
+            if metrics is not None:
+                metrics.malformed += 1
+            continue
+
+        yield operation, node_a, node_b, timestamp
+
+
+def micro_batches(events, batch_size=1000, window=1.0):
+    """
+    This method groups events into micro-batches, that are closed when they reach batch_size events
+    or when window seconds passed since their first event
+    :param events: iterable of events, None marks an idle stream
+    :param batch_size: int. the maximum number of events of a batch
+    :param window: float. the maximum age in seconds of a batch
+    :return: generator of lists of events
+    """
+    batch = list()
+    started = None
+    for event in events:
+        if event is not None:
+            if not batch:
+                started = time.monotonic()
+            batch.append(event)
+
+        if batch and (len(batch) >= batch_size or time.monotonic() - started >= window):
+            yield batch
+            batch = list()
+
+    if batch:
+        yield batch
+
+
+class IngestionMetrics:
+    """
+    Counters of the ingestion pipeline, reported after every window
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.events = 0
+        self.malformed = 0
+        self.batches = 0
+        self.recomputed = 0
+        self.pending = 0
+        self.lag = None
+        self.max_lag = 0
+
+    def record_lag(self, timestamp):
+        if timestamp is None:
+            return
+
+        self.lag = max(time.time() - timestamp, 0)
+        self.max_lag = max(self.max_lag, self.lag)
+
+    def events_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.events / elapsed if elapsed > 0 else 0
+
+    def report(self, stream=sys.stderr):
+        lag = '-' if self.lag is None else '{:.3f} s'.format(self.lag)
+        print('events: {} ({:.1f}/s), malformed: {}, batches: {}, recomputed: {}, pending: {}, '
+              'lag: {}, max lag: {:.3f} s'.format(self.events, self.events_per_second(), self.malformed,
+                                                  self.batches, self.recomputed, self.pending, lag,
+                                                  self.max_lag), file=stream)
+
+
+class EventIngestor:
+    """
+    Applies a stream of friendship changes to a Recommendations instance and keeps the top
+    recommendations of the affected users up to date
+    """
+
+    def __init__(self, recommender, score='common_neighbors', max_recompute=1000, max_pending=10000):
+        """
+        :param recommender: Recommendations, over a mutable friend dictionary
+        :param score: str. the name of the similarity score used for the recommendations
+        :param max_recompute: int. the maximum number of users recomputed per window
+        :param max_pending: int. the number of users waiting for recomputation above which no new
+        events are read until the backlog is drained
+        """
+        self.recommender = recommender
+        self.score = score
+        self.max_recompute = max_recompute
+        self.max_pending = max_pending
+        self.metrics = IngestionMetrics()
+        # fails before any event is read if the recommendations were computed with another score
+        recommender.recommendations.check_score(score)
+        # used as an insertion ordered set, so that the oldest changes are recomputed first
+        self.pending = OrderedDict()
+
+    def mark_neighborhood(self, node_a, node_b):
+        """
+        This method marks the users whose scores change with the edge: its two ends and their
+        friends, whose 2-hop neighborhood changes. For degree sensitive scores the friends of
+        friends are marked too, as the ends are candidates of theirs and their degree changes
+        """
+        graph = self.recommender.graph
+        degree_sensitive = self.score in DEGREE_SENSITIVE_SCORES
+        for node in (node_a, node_b):
+            self.pending[node] = None
+            for friend in graph.get(node, ()):
+                self.pending[friend] = None
+                if degree_sensitive:
+                    for friend_of_friend in graph.get(friend, ()):
+                        self.pending[friend_of_friend] = None
+
+    def apply_batch(self, batch):
+        """
+        This method applies a micro-batch of events to the graph
+        :param batch: list of (operation, node, node, timestamp) tuples
+        """
+        for operation, node_a, node_b, timestamp in batch:
+            # neighbors before a removal and after an addition cover both versions of the neighborhood
+            if operation == REMOVE:
+                self.mark_neighborhood(node_a, node_b)
+                self.recommender.remove_edge(node_a, node_b)
+            else:
+                self.recommender.add_edge(node_a, node_b)
+                self.mark_neighborhood(node_a, node_b)
+
+            self.metrics.record_lag(timestamp)
+
+        self.metrics.events += len(batch)
+        self.metrics.batches += 1
+
+    def recompute(self, limit, emit=None):
+        """
+        This method recomputes the top recommendations of at most limit pending users
+        :param limit: int. the maximum number of users to recompute
+        :param emit: callable, that receives each recomputed user and its recommendations
+        """
+        graph = self.recommender.graph
+
+        for _ in range(min(limit, len(self.pending))):
+            node, _ = self.pending.popitem(last=False)
+            if node in graph:
+                suggestions = self.recommender.update_recommendations(node, self.score)
+                if emit is not None:
+                    emit(node, suggestions)
+            self.metrics.recomputed += 1
+
+        self.metrics.pending = len(self.pending)
+
+    def run(self, batches, report=None, emit=None):
+        """
+        This method consumes micro-batches, recomputing the affected users after each of them. The
+        next batch is only pulled once the backlog of pending users is below max_pending
+        :param batches: iterable of lists of events
+        :param report: callable, that receives the metrics after every window
+        :param emit: callable, that receives each recomputed user and its recommendations
+        :return: IngestionMetrics
+        """
+        for batch in batches:
+            self.apply_batch(batch)
+            self.recompute(self.max_recompute, emit)
+            while len(self.pending) > self.max_pending:
+                self.recompute(self.max_recompute, emit)
+
+            if report is not None:
+                report(self.metrics)
+
+        if self.pending:
+            self.recompute(len(self.pending), emit)
+            if report is not None:
+                report(self.metrics)
+
+        return self.metrics
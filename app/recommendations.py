@@ -1,6 +1,227 @@
-from pprint import pprint
-import numpy as np
-import random
+from collections.abc import MutableMapping
+from array import array
+import bisect
+import math
+import struct
+
+
+HEADER = struct.Struct('qqqqq')
+EMPTY = -1
+
+
+class RecommendationTable(MutableMapping):
+    """
+    Compact container of the top recommendations of every node. Candidates and scores are kept in
+    two contiguous arrays of shape [number of nodes, k], int32 node rows and float32 scores,
+    with -1 marking the empty slots of short lists. It behaves like a dict of lists of
+    (node, score) tuples, which are built on access.
+    """
+
+    # scores that count nodes, their recommendations are returned with int scores
+    # (exact up to 2 ** 24, the precision of float32)
+    INTEGER_SCORES = ('common_neighbors', 'baseline')
+
+    def __init__(self, k, nodes=(), score=None):
+        """
+        :param k: int. the number of recommendations kept per node
+        :param nodes: iterable of node ids, that get a row in advance
+        :param score: str. the name of the score of the recommendations, None until the first
+        ones are stored
+        """
+        self.k = k
+        self.score = score
+        # the rows of the nodes given in advance follow their sorted order, so that they are found
+        # by binary search; a dict would cost more memory per node than the row itself
+        self.sorted_nodes = sorted(dict.fromkeys(nodes))
+        # nodes added later, e.g. by new edges, get the next rows
+        self.added_nodes = list()
+        self.added_rows = dict()
+        self.present = bytearray(len(self.sorted_nodes))
+        self.size = 0
+        self.ids = array('i', [EMPTY]) * (len(self.sorted_nodes) * k)
+        self.scores = array('f', [0.0]) * (len(self.sorted_nodes) * k)
+
+    @property
+    def integer_scores(self):
+        return self.score in self.INTEGER_SCORES
+
+    def check_score(self, score):
+        """
+        This method makes sure that the table holds recommendations of the given score, so that
+        scores of different kinds are never mixed. A table without a score takes the given one
+        :param score: str. the name of the score
+        """
+        if self.score is None:
+            self.score = score
+        elif self.score != score:
+            raise ValueError('the table holds {} recommendations, not {}'.format(self.score, score))
+
+    def node(self, row):
+        """
+        :param row: int. a row of the table, e.g. a candidate id of to_numpy
+        :return: the id of the node of the row
+        """
+        if row < len(self.sorted_nodes):
+            return self.sorted_nodes[row]
+
+        return self.added_nodes[row - len(self.sorted_nodes)]
+
+    def find(self, node):
+        """
+        :param node: id of a node
+        :return: int. the row of the node, or None if the node has no row
+        """
+        i = bisect.bisect_left(self.sorted_nodes, node)
+        if i < len(self.sorted_nodes) and self.sorted_nodes[i] == node:
+            return i
+
+        return self.added_rows.get(node)
+
+    def row(self, node):
+        """
+        This method finds the row of a node, appending an empty one if the node is new
+        :param node: id of a node
+        :return: int. the row of the node
+        """
+        i = self.find(node)
+        if i is None:
+            i = len(self.present)
+            self.added_rows[node] = i
+            self.added_nodes.append(node)
+            self.present.append(0)
+            self.grow()
+
+        return i
+
+    def grow(self):
+        """
+        This method appends an empty row to the arrays. Arrays exported by to_numpy can not be
+        resized, so the table then continues on copies and the exported views keep the former rows
+        """
+        try:
+            self.ids.extend([EMPTY] * self.k)
+        except BufferError:
+            self.ids = array('i', self.ids)
+            self.ids.extend([EMPTY] * self.k)
+
+        try:
+            self.scores.extend([0.0] * self.k)
+        except BufferError:
+            self.scores = array('f', self.scores)
+            self.scores.extend([0.0] * self.k)
+
+    def __getitem__(self, node):
+        i = self.find(node)
+        if i is None or not self.present[i]:
+            raise KeyError(node)
+
+        start = i * self.k
+        suggestions = list()
+        for j in range(start, start + self.k):
+            candidate = self.ids[j]
+            if candidate == EMPTY:
+                break
+            score = self.scores[j]
+            suggestions.append((self.node(candidate), int(score) if self.integer_scores else round(score, 4)))
+
+        return suggestions
+
+    def __setitem__(self, node, suggestions):
+        """
+        :param node: id of a node
+        :param suggestions: list of (node, score) tuples, sorted by score; only the first k are kept
+        """
+        i = self.row(node)
+        start = i * self.k
+        suggestions = suggestions[:self.k]
+        for j, (candidate, score) in enumerate(suggestions):
+            self.ids[start + j] = self.row(candidate)
+            self.scores[start + j] = score
+        for j in range(start + len(suggestions), start + self.k):
+            self.ids[j] = EMPTY
+            self.scores[j] = 0.0
+
+        if not self.present[i]:
+            self.present[i] = 1
+            self.size += 1
+
+    def __delitem__(self, node):
+        i = self.find(node)
+        if i is None or not self.present[i]:
+            raise KeyError(node)
+
+        start = i * self.k
+        for j in range(start, start + self.k):
+            self.ids[j] = EMPTY
+            self.scores[j] = 0.0
+        self.present[i] = 0
+        self.size -= 1
+
+    def __iter__(self):
+        nodes = self.sorted_nodes + self.added_nodes
+        return (node for node, present in zip(nodes, self.present) if present)
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, dict(self.items()))
+
+    def to_numpy(self):
+        """
+        This method exposes the tables as NumPy arrays without copying them; node maps the rows and
+        candidate ids back to node ids. Changes of existing rows are visible through the arrays,
+        until a new node is added and the table moves to new arrays
+        :return: tuple with the ids (int32) and scores (float32) of shape [number of nodes, k] and
+        the boolean mask of the filled slots
+        """
+        import numpy as np
+
+        ids = np.frombuffer(self.ids, dtype=np.int32).reshape(-1, self.k)
+        scores = np.frombuffer(self.scores, dtype=np.float32).reshape(-1, self.k)
+
+        return ids, scores, ids != EMPTY
+
+    def save(self, file_name):
+        """
+        This method stores the table in a binary file, writing the arrays as they are in memory.
+        Node ids have to be strings without line breaks, as the ones read by DataFetcher
+        :param file_name: str. the path of the file
+        """
+        names = '\n'.join(self.sorted_nodes + self.added_nodes).encode()
+        score = (self.score or '').encode()
+        with open(file_name, 'wb') as fp:
+            fp.write(HEADER.pack(self.k, len(self.present), len(self.sorted_nodes), len(names), len(score)))
+            fp.write(memoryview(self.ids))
+            fp.write(memoryview(self.scores))
+            fp.write(self.present)
+            fp.write(names)
+            fp.write(score)
+
+    @staticmethod
+    def load(file_name):
+        """
+        This method loads a table that was stored with save
+        :param file_name: str. the path of the file
+        :return: RecommendationTable
+        """
+        with open(file_name, 'rb') as fp:
+            k, n, sorted_size, names_size, score_size = HEADER.unpack(fp.read(HEADER.size))
+
+            table = RecommendationTable(k)
+            table.ids.fromfile(fp, n * k)
+            table.scores.fromfile(fp, n * k)
+            table.present = bytearray(fp.read(n))
+            names = fp.read(names_size).decode()
+            table.score = fp.read(score_size).decode() or None
+
+        nodes = names.split('\n') if n else list()
+        table.sorted_nodes = nodes[:sorted_size]
+        table.added_nodes = nodes[sorted_size:]
+        table.added_rows = {node: i for i, node in enumerate(table.added_nodes, sorted_size)}
+        table.size = sum(table.present)
+
+        return table
 
 
 class Recommendations:
@@ -14,7 +235,7 @@ class Recommendations:
         """
         self.graph = graph
         self.number_of_suggestions = number_of_suggestions
-        self.recommendations = dict()
+        self.recommendations = RecommendationTable(number_of_suggestions)
 
     def run_common_neighbors(self, node, candidate_node):
         """
@@ -62,12 +283,23 @@ class Recommendations:
         set_b = self.graph[candidate_node]
         common_nodes = set_a & set_b
 
+        # graphs published to shared memory carry a precomputed table of the inverse logs
+        adamic_adar_weight = getattr(self.graph, 'adamic_adar_weight', None)
+
         score = 0
         for node in common_nodes:
+            if adamic_adar_weight is not None:
+                score += adamic_adar_weight(node)
+                continue
+
             try:
-                score += 1 / np.log(len(self.graph.get(node)))
+                degree = len(self.graph.get(node))
             except TypeError:
-                score += 0
+                continue
+
+            # a node with a single friend has log(1) = 0 and adds nothing
+            if degree > 1:
+                score += 1 / math.log(degree)
 
         return round(score, 4)
 
@@ -82,7 +314,7 @@ class Recommendations:
         set_b = self.graph[candidate_node]
         common_nodes = set_a & set_b
 
-        score = len(common_nodes) / np.sqrt(len(set_a)*len(set_b))
+        score = len(common_nodes) / math.sqrt(len(set_a)*len(set_b))
 
         return round(score, 4)
 
@@ -98,13 +330,22 @@ class Recommendations:
 
         return sorted_nodes_score
 
-    def run_algorithm(self, node, algorithm):
+    def run_algorithm(self, node, algorithm, limit=None):
         """
         This method finds for a given node, its candidate recommendations sorted by their score
         :param node: int. the id number of a node
         :param algorithm: str. the name of the similarity score that will be calculated
+        :param limit: int. the number of top candidates to return, all of them if None
         :return: list with sorted candidate node recommendations
         """
+        # graphs published to shared memory score over their own tables, without decoding them
+        shared_run_algorithm = getattr(self.graph, 'run_algorithm', None)
+        if shared_run_algorithm is not None:
+            return shared_run_algorithm(node, algorithm, limit)
+
+        if algorithm == 'baseline':
+            import random
+
         node_rec = dict()
         for friend_node in self.graph[node]:
 
@@ -136,25 +377,39 @@ class Recommendations:
                 if score != 0:
                     node_rec[friend_of_friend_node] = score
 
-        return self.sort_nodes(node_rec)
+        return self.sort_nodes(node_rec)[:limit]
 
     def find_recommendations(self, score):
         """
         This method find top recommendations for each node of a network
-        :return: dict. with the top recommended nodes for each node of the network
+        :return: RecommendationTable with the top recommended nodes for each node of the network
         """
         assert (score == 'common_neighbors' or 'jaccard' or 'adamic_adar')
 
-        rec = dict()
+        rec = RecommendationTable(self.number_of_suggestions, self.graph, score=score)
         for node in self.graph:
-            rec[node] = self.run_algorithm(node, algorithm=score)[:self.number_of_suggestions]
+            rec[node] = self.run_algorithm(node, algorithm=score, limit=self.number_of_suggestions)
 
         self.recommendations = rec
 
+    def update_recommendations(self, node, score):
+        """
+        This method recomputes the top recommendations of a single node, e.g. after its friends changed
+        :param node: id of a node
+        :param score: str. the name of the score, it has to be the one of the stored recommendations
+        :return: list of the top (node, score) tuples
+        """
+        self.recommendations.check_score(score)
+        self.recommendations[node] = self.run_algorithm(node, algorithm=score, limit=self.number_of_suggestions)
+
+        return self.recommendations[node]
+
     def evaluate_scoring_functions(self):
         """
         This method evaluates which scoring function recommends the best links
         """
+        import random
+
         times_of_execution = 0
         algo_list = ['common_neighbors', 'jaccard', 'adamic_adar', 'cosine', 'baseline']
         total_rank_list = {'common_neighbors': [], 'jaccard': [], 'adamic_adar': [], 'cosine': [], 'baseline': []}
@@ -217,11 +472,20 @@ class Recommendations:
                 average_rank = round(sum(total_rank_list[item]) / len(total_rank_list[item]), 2)
             print('The average rank of the correct recommendation for ' + item + ' is: ' + str(average_rank))
 
+    def check_writable(self):
+        """
+        This method makes sure the graph can be changed, read-only graphs such as a SharedGraph
+        are not a MutableMapping
+        """
+        if self.graph is not None and not isinstance(self.graph, MutableMapping):
+            raise TypeError('the graph of type {} is read-only'.format(type(self.graph).__name__))
+
     def remove_edge(self, e, e2):
         """
         This method removes an edge from the graph
         :return: True or None
         """
+        self.check_writable()
         try:
             if self.graph != None:
                 if e in self.graph and e2 in self.graph[e]:
@@ -234,10 +498,15 @@ class Recommendations:
             return None
 
     def add_edge(self, f1, f2):
+        """
+        This method adds an edge to the graph, creating the nodes that are not yet part of it
+        :return: True or None
+        """
+        self.check_writable()
         try:
             if self.graph != None:
-                self.graph[f1].add(f2)
-                self.graph[f2].add(f1)
+                self.graph.setdefault(f1, set()).add(f2)
+                self.graph.setdefault(f2, set()).add(f1)
             return True
 
         except:
@@ -258,7 +527,7 @@ class Recommendations:
         This method computes the number of users with same and different top 10 recommendations
         """
         self.get_ids_multiple_to_100()
-        self.recommended_list_per_algorithm = {'common_neighbors': dict(), 'jaccard': dict(), 'adamic_adar': dict(), 'cosine': dict(), ''baseline': dict()}
+        self.recommended_list_per_algorithm = {'common_neighbors': dict(), 'jaccard': dict(), 'adamic_adar': dict(), 'cosine': dict(), 'baseline': dict()}
 
         algo_list = ['common_neighbors', 'jaccard', 'adamic_adar', 'cosine', 'baseline']
 
@@ -320,6 +589,8 @@ class Recommendations:
     
     
 if __name__ == '__main__':
+    from pprint import pprint
+
     dict_ex = {'0': {'1', '3'},
                '1': {'0', '2', '3'},
                '2': {'1', '3'},
@@ -0,0 +1,386 @@
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+from array import array
+import functools
+import math
+import mmap
+import os
+import random
+import struct
+import sys
+import zlib
+
+
+HEADER = struct.Struct('qqqq')
+
+
+class _AttachedBlock:
+    """
+    Read-only mapping of an existing shared memory block. Before Python 3.13 SharedMemory registers
+    every block it opens with the resource tracker, which unlinks it when the worker exits and, for
+    workers started with multiprocessing, drops the registration of the publisher; the segment is
+    therefore opened directly, without registering it
+    """
+
+    def __init__(self, name):
+        import _posixshmem
+
+        fd = _posixshmem.shm_open('/' + name, os.O_RDONLY, mode=0o600)
+        try:
+            self._mmap = mmap.mmap(fd, os.fstat(fd).st_size, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        self.name = name
+        self.buf = memoryview(self._mmap)
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+
+def _attach(name):
+    """
+    This method attaches to an existing shared memory block without registering it with the
+    resource tracker, so that only the publisher unlinks it
+    :param name: str. the name of the shared memory block
+    :return: SharedMemory, or _AttachedBlock before Python 3.13
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    if os.name == 'nt':
+        # Windows frees the block with its last handle, there is no resource tracker
+        return shared_memory.SharedMemory(name=name)
+
+    return _AttachedBlock(name)
+
+
+class GraphPublisher:
+    """
+    Publishes a friend dictionary into shared memory, once per host, so that serving workers can
+    attach to it instead of building their own copy. Every publish creates a new version of the
+    graph; the current version number lives in a small manifest block named after the publisher.
+    """
+
+    def __init__(self, name):
+        """
+        :param name: str. the name of the manifest block, shared with the workers
+        """
+        self.name = name
+        self.version = 0
+        self.manifest = shared_memory.SharedMemory(name=name, create=True, size=8)
+        struct.pack_into('q', self.manifest.buf, 0, self.version)
+        self.block = None
+
+    @staticmethod
+    def block_name(name, version):
+        return '{}_v{}'.format(name, version)
+
+    @staticmethod
+    def hash_slots(encoded):
+        """
+        This method builds an open addressing hash index from the encoded node names to their
+        positions. crc32 is used instead of hash(), which is randomized per process
+        :param encoded: list of the encoded node names
+        :return: array with a power of two number of slots, -1 for the empty ones
+        """
+        size = 1
+        while size < 2 * len(encoded):
+            size *= 2
+
+        slots = array('i', [-1]) * size
+        for i, name in enumerate(encoded):
+            slot = zlib.crc32(name) & (size - 1)
+            while slots[slot] != -1:
+                slot = (slot + 1) & (size - 1)
+            slots[slot] = i
+
+        return slots
+
+    @staticmethod
+    def pack_graph(graph):
+        """
+        This method lays out a friend dictionary as contiguous tables: the sorted node names, the
+        offsets of each node's neighbors, the neighbor indices, the Adamic & Adar weights and the
+        hash index of the names
+        :param graph: dict. of nodes with the set of nodes they are connected to
+        :return: tuple with the sorted nodes and the tables
+        """
+        nodes = sorted(graph)
+        index = {node: i for i, node in enumerate(nodes)}
+
+        offsets = array('q', [0])
+        neighbors = array('i')
+        for node in nodes:
+            neighbors.extend(sorted(index[friend] for friend in graph[node]))
+            offsets.append(len(neighbors))
+
+        weights = array('d')
+        for i in range(len(nodes)):
+            degree = offsets[i + 1] - offsets[i]
+            weights.append(1 / math.log(degree) if degree > 1 else 0.0)
+
+        encoded = [node.encode() for node in nodes]
+        name_offsets = array('q', [0])
+        for name in encoded:
+            name_offsets.append(name_offsets[-1] + len(name))
+
+        return nodes, offsets, neighbors, weights, name_offsets, GraphPublisher.hash_slots(encoded), b''.join(encoded)
+
+    def publish(self, graph):
+        """
+        This method writes a new version of the graph and switches the manifest to it. The previous
+        version is unlinked; workers that are still attached to it keep a valid mapping until they refresh
+        :param graph: dict. of nodes with the set of nodes they are connected to
+        :return: int. the published version
+        """
+        nodes, offsets, neighbors, weights, name_offsets, slots, names = self.pack_graph(graph)
+        n, m = len(nodes), len(neighbors)
+        size = HEADER.size + 8 * (n + 1) * 2 + 8 * n + 4 * m + 4 * len(slots) + len(names)
+
+        version = self.version + 1
+        block = shared_memory.SharedMemory(name=self.block_name(self.name, version), create=True,
+                                           size=max(size, 1))
+
+        position = HEADER.size
+        HEADER.pack_into(block.buf, 0, n, m, len(names), len(slots))
+        for table in (offsets, name_offsets, weights, neighbors, slots):
+            end = position + table.itemsize * len(table)
+            block.buf[position:end] = table.tobytes()
+            position = end
+        block.buf[position:position + len(names)] = names
+
+        struct.pack_into('q', self.manifest.buf, 0, version)
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+        self.block = block
+        self.version = version
+
+        return version
+
+    def close(self):
+        """
+        This method removes the published graph and the manifest
+        """
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+        self.manifest.close()
+        self.manifest.unlink()
+
+
+class SharedGraph(Mapping):
+    """
+    Read-only friend dictionary over a graph published by GraphPublisher. It can be passed to
+    Recommendations in place of the dict built by DataFetcher, which then scores over the shared
+    tables with run_algorithm.
+    """
+
+    def __init__(self, name, cache_size=1024):
+        """
+        :param name: str. the name of the manifest block
+        :param cache_size: int. the number of neighbor sets decoded by __getitem__ that this worker
+        keeps. Each one costs about 150 bytes per friend, e.g. 3.5 MB for the default size and nodes
+        of 25 friends; the scores of run_algorithm do not use it
+        """
+        self.name = name
+        self.cache_size = cache_size
+        self.manifest = _attach(name)
+        self.version = 0
+        self.block = None
+        self.refresh()
+
+    def current_version(self):
+        return struct.unpack_from('q', self.manifest.buf, 0)[0]
+
+    def refresh(self):
+        """
+        This method attaches to the latest published version, if it is newer than the current one.
+        Workers call it between requests, so that a rebuilt graph is rolled in without a restart
+        :return: True if a new version was attached
+        """
+        version = self.current_version()
+        while version != self.version:
+            try:
+                block = _attach(GraphPublisher.block_name(self.name, version))
+            except FileNotFoundError:
+                # a newer version replaced it while attaching
+                version = self.current_version()
+                continue
+
+            self._release()
+            self.block = block
+            self.version = version
+            self._map_tables()
+            return True
+
+        return False
+
+    def _map_tables(self):
+        n, m, names_size, slot_count = HEADER.unpack_from(self.block.buf, 0)
+        position = HEADER.size
+
+        tables = list()
+        for fmt, length in (('q', n + 1), ('q', n + 1), ('d', n), ('i', m), ('i', slot_count)):
+            end = position + struct.calcsize(fmt) * length
+            tables.append(self.block.buf[position:end].cast(fmt))
+            position = end
+
+        self.offsets, self.name_offsets, self.weights, self.neighbors, self.slots = tables
+        # slicing the underlying mmap returns bytes directly, which is much faster than a memoryview
+        self.mapping = self.block.buf.obj
+        self.names_start = position
+        self.nodes = _Names(self.mapping, position, self.name_offsets, n)
+        self._neighbor_set = functools.lru_cache(maxsize=self.cache_size)(self._decode_neighbors)
+
+    def _release(self):
+        if self.block is None:
+            return
+
+        for view in (self.offsets, self.name_offsets, self.weights, self.neighbors, self.slots):
+            view.release()
+        self.block.close()
+        self.block = None
+
+    def _find(self, node):
+        if not isinstance(node, str):
+            return -1
+
+        key = node.encode()
+        mapping, start, name_offsets = self.mapping, self.names_start, self.name_offsets
+        mask = len(self.slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            i = self.slots[slot]
+            if i < 0 or mapping[start + name_offsets[i]:start + name_offsets[i + 1]] == key:
+                return i
+            slot = (slot + 1) & mask
+
+    def index(self, node):
+        """
+        This method finds the position of a node through the shared hash index
+        :param node: str. id of a node
+        :return: int. the position, or -1 if the node is not part of the graph
+        """
+        return self._find(node)
+
+    def _decode_neighbors(self, node):
+        i = self._find(node)
+        if i < 0:
+            return None
+
+        return frozenset([self.nodes[j] for j in self.neighbors[self.offsets[i]:self.offsets[i + 1]]])
+
+    def run_algorithm(self, node, algorithm, limit=None):
+        """
+        This method finds for a given node its candidate recommendations sorted by their score, as
+        Recommendations.run_algorithm does, but over the positions of the shared tables: the common
+        neighbors come from the sorted neighbor slices and the degrees and weights from the tables.
+        Only the names of the returned candidates are decoded
+        :param node: str. id of a node
+        :param algorithm: str. the name of the similarity score that will be calculated
+        :param limit: int. the number of top candidates to return, all of them if None
+        :return: list with sorted (node, score) tuples
+        """
+        i = self.index(node)
+        if i < 0:
+            raise KeyError(node)
+
+        offsets, neighbors, weights = self.offsets, self.neighbors, self.weights
+        friends = neighbors[offsets[i]:offsets[i + 1]]
+        friend_set = set(friends)
+        degree = len(friends)
+
+        candidates = set()
+        for friend in friends:
+            candidates.update(neighbors[offsets[friend]:offsets[friend + 1]])
+        candidates.discard(i)
+        candidates -= friend_set
+
+        scores = list()
+        for candidate in candidates:
+            candidate_friends = neighbors[offsets[candidate]:offsets[candidate + 1]]
+            common = friend_set.intersection(candidate_friends)
+
+            if algorithm == 'common_neighbors':
+                score = len(common)
+
+            elif algorithm == 'jaccard':
+                score = round(len(common) / (degree + len(candidate_friends) - len(common)), 4)
+
+            elif algorithm == 'adamic_adar':
+                score = round(sum([weights[j] for j in common]), 4)
+
+            elif algorithm == 'cosine':
+                score = round(len(common) / math.sqrt(degree * len(candidate_friends)), 4)
+
+            elif algorithm == 'baseline':
+                score = random.randint(0, len(self))
+
+            # ignore nodes with zero common friends (score)
+            if score != 0:
+                scores.append((-score, candidate))
+
+        # positions follow the order of the names, so ties yield the node with the smallest nodeID
+        scores.sort()
+        return [(self.nodes[candidate], -score) for score, candidate in scores[:limit]]
+
+    def degree(self, node):
+        i = self.index(node)
+        if i < 0:
+            raise KeyError(node)
+
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def adamic_adar_weight(self, node):
+        """
+        :param node: str. id of a node
+        :return: float. 1 / log(degree) of the node, 0 for nodes with less than two friends
+        """
+        i = self.index(node)
+        if i < 0:
+            raise KeyError(node)
+
+        return self.weights[i]
+
+    def __getitem__(self, node):
+        neighbors = self._neighbor_set(node)
+        if neighbors is None:
+            raise KeyError(node)
+
+        return neighbors
+
+    def __contains__(self, node):
+        return self.index(node) >= 0
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def close(self):
+        self._release()
+        self.manifest.close()
+
+
+class _Names:
+    """
+    Sequence of the node names stored in a shared block, decoded on access
+    """
+
+    def __init__(self, mapping, start, name_offsets, length):
+        self.mapping = mapping
+        self.start = start
+        self.name_offsets = name_offsets
+        self.length = length
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.length:
+            raise IndexError(i)
+
+        return self.mapping[self.start + self.name_offsets[i]:self.start + self.name_offsets[i + 1]].decode()
+
+    def __len__(self):
+        return self.length
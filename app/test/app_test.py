@@ -0,0 +1,39 @@
+from app.app import build_parser
+
+import unittest
+
+
+class AppTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = build_parser()
+
+    def tearDown(self):
+        pass
+
+    def test_parse_recommend(self):
+        args = self.parser.parse_args(['--timing', 'recommend', 'network.pkl', '107', '1126',
+                                       '--score', 'jaccard', '-n', '5'])
+
+        self.assertTrue(args.timing)
+        self.assertEqual(args.command, 'recommend')
+        self.assertEqual(args.users, ['107', '1126'])
+        self.assertEqual(args.score, 'jaccard')
+        self.assertEqual(args.number, 5)
+
+    def test_parse_build_snapshot(self):
+        args = self.parser.parse_args(['build-snapshot', 'edges.txt', 'network.pkl'])
+
+        self.assertFalse(args.timing)
+        self.assertEqual(args.edges, 'edges.txt')
+        self.assertEqual(args.snapshot, 'network.pkl')
+
+    def test_parse_unknown_score(self):
+        with self.assertRaises(SystemExit):
+            self.parser.parse_args(['recommend', 'network.pkl', '107', '--score', 'unknown'])
+
+    def test_parse_ingest(self):
+        args = self.parser.parse_args(['ingest', 'network.pkl', '--save-recommendations', 'network.rec', '-q'])
+
+        self.assertEqual(args.events, '-')
+        self.assertEqual(args.save_recommendations, 'network.rec')
+        self.assertTrue(args.quiet)
@@ -1,5 +1,7 @@
 from app.data_fetcher import DataFetcher
 
+import os
+import tempfile
 import unittest
 
 
@@ -55,3 +57,11 @@ class DataFetcherTest(unittest.TestCase):
         self.assertEqual(len(friend_dict_output), len(self.friend_dict))
         self.assertEqual(type(friend_dict_output), type(self.friend_dict))
         self.assertCountEqual(friend_dict_output, self.friend_dict)
+
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'network.pkl')
+            DataFetcher.save_snapshot(self.friend_dict, file_name)
+            friend_dict_output = DataFetcher.load_snapshot(file_name)
+
+        self.assertEqual(friend_dict_output, self.friend_dict)
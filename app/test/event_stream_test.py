@@ -0,0 +1,139 @@
+from app.event_stream import EventIngestor, IngestionMetrics, micro_batches, parse_events, read_stream
+from app.recommendations import Recommendations
+
+import os
+import unittest
+
+
+class EventStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.friend_dict = {'0': {'1', '3'},
+                            '1': {'0', '2', '3'},
+                            '2': {'1', '3'},
+                            '3': {'0', '1', '2', '4'},
+                            '4': {'3', '5', '6'},
+                            '5': {'4', '6'},
+                            '6': {'4', '5'}}
+
+    def tearDown(self):
+        pass
+
+    def test_parse_events(self):
+        lines = ['add 0 2 1500000000.5\n', 'remove 3 4\n', '# comment\n', '\n',
+                 'update 1 2\n', 'add 1\n', 'add 1 1\n', None]
+        metrics = IngestionMetrics()
+
+        events = list(parse_events(lines, metrics))
+
+        self.assertEqual(events, [('add', '0', '2', 1500000000.5), ('remove', '3', '4', None), None])
+        self.assertEqual(metrics.malformed, 3)
+
+    def test_read_stream_marks_idle_pipe(self):
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd) as stream:
+            lines = read_stream(stream, poll_interval=0.01)
+            os.write(write_fd, 'add 0 2\nremove 3'.encode())
+
+            self.assertEqual(next(lines), 'add 0 2\n')
+            self.assertIsNone(next(lines))
+
+            os.write(write_fd, ' 4\nadd 5'.encode())
+            self.assertEqual(next(lines), 'remove 3 4\n')
+
+            os.close(write_fd)
+            self.assertEqual(list(lines), ['add 5'])
+
+    def test_micro_batches(self):
+        events = [('add', str(i), str(i + 1), None) for i in range(5)]
+
+        batches = list(micro_batches(events, batch_size=2, window=60))
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+    def test_micro_batches_closes_window_when_idle(self):
+        events = [('add', '0', '2', None), None]
+
+        batches = list(micro_batches(iter(events), batch_size=10, window=0))
+
+        self.assertEqual(batches, [[('add', '0', '2', None)]])
+
+    def test_ingestor_matches_full_recomputation_for_every_score(self):
+        events = [('add', '3', '5', None), ('add', '3', '6', None), ('remove', '1', '2', None),
+                  ('add', '0', '4', None)]
+
+        for score in ['common_neighbors', 'jaccard', 'adamic_adar', 'cosine']:
+            path = {'0': {'1'}, '1': {'0', '2'}, '2': {'1', '3'}, '3': {'2', '4'}, '4': {'3'}}
+            rec_obj = Recommendations(path)
+            rec_obj.find_recommendations(score=score)
+
+            EventIngestor(rec_obj, score=score).run(micro_batches(events, batch_size=1))
+
+            expected = Recommendations({node: set(friends) for node, friends in path.items()})
+            expected.find_recommendations(score=score)
+
+            self.assertEqual(rec_obj.recommendations, expected.recommendations, score)
+
+    def test_ingestor_matches_full_recomputation(self):
+        rec_obj = Recommendations(self.friend_dict)
+        rec_obj.find_recommendations(score='common_neighbors')
+        ingestor = EventIngestor(rec_obj, max_recompute=2, max_pending=3)
+
+        events = [('add', '0', '2', None), ('remove', '3', '4', None), ('add', '6', '7', None)]
+        metrics = ingestor.run(micro_batches(events, batch_size=2))
+
+        expected = Recommendations({node: set(friends) for node, friends in self.friend_dict.items()})
+        expected.find_recommendations(score='common_neighbors')
+
+        self.assertEqual(self.friend_dict['7'], {'6'})
+        self.assertEqual(rec_obj.recommendations, expected.recommendations)
+        self.assertEqual(metrics.events, 3)
+        self.assertEqual(metrics.batches, 2)
+        self.assertEqual(metrics.pending, 0)
+
+    def test_ingestor_emits_recomputed_users(self):
+        rec_obj = Recommendations(self.friend_dict)
+        emitted = dict()
+
+        EventIngestor(rec_obj).run([[('add', '5', '7', None)]],
+                                   emit=lambda node, suggestions: emitted.update({node: suggestions}))
+
+        self.assertCountEqual(emitted, ['4', '5', '6', '7'])
+        self.assertEqual(emitted['7'], [('4', 1), ('6', 1)])
+        self.assertEqual(emitted, dict(rec_obj.recommendations))
+
+    def test_ingestor_rejects_another_score(self):
+        rec_obj = Recommendations(self.friend_dict)
+        rec_obj.find_recommendations(score='common_neighbors')
+
+        self.assertRaises(ValueError, EventIngestor, rec_obj, score='jaccard')
+        self.assertRaises(ValueError, rec_obj.update_recommendations, '0', 'jaccard')
+        self.assertEqual(rec_obj.recommendations['0'], [('2', 2), ('4', 1)])
+
+    def test_ingestor_after_numpy_export(self):
+        rec_obj = Recommendations(self.friend_dict)
+        rec_obj.find_recommendations(score='common_neighbors')
+        ids, scores, mask = rec_obj.recommendations.to_numpy()
+        exported = mask.sum()
+
+        EventIngestor(rec_obj).run([[('add', '1', '2', None), ('add', '6', '7', None)]])
+
+        expected = Recommendations({node: set(friends) for node, friends in self.friend_dict.items()})
+        expected.find_recommendations(score='common_neighbors')
+
+        self.assertEqual(rec_obj.recommendations, expected.recommendations)
+        self.assertEqual(ids.shape, (7, rec_obj.number_of_suggestions))
+        self.assertEqual(mask.sum(), exported)
+        self.assertEqual(rec_obj.recommendations.to_numpy()[0].shape, (8, rec_obj.number_of_suggestions))
+
+    def test_ingestor_reports_once_per_window(self):
+        rec_obj = Recommendations(self.friend_dict)
+        reports = list()
+
+        EventIngestor(rec_obj, max_recompute=100).run([[('add', '0', '2', None)]],
+                                                      report=lambda metrics: reports.append(metrics.recomputed))
+        self.assertEqual(reports, [4])
+
+        reports = list()
+        EventIngestor(rec_obj, max_recompute=1).run([[('add', '0', '4', None)]],
+                                                    report=lambda metrics: reports.append(metrics.recomputed))
+        self.assertEqual(reports, [1, 7])
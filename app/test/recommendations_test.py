@@ -1,5 +1,8 @@
-from app.recommendations import Recommendations
+from app.recommendations import RecommendationTable, Recommendations
 
+from collections.abc import Mapping
+import os
+import tempfile
 import unittest
 
 
@@ -115,19 +118,80 @@ class RecommendationsTest(unittest.TestCase):
         kn_obj_1.find_recommendations(score='common_neighbors')
         rec = kn_obj_1.recommendations
         self.assertEqual(len(rec), len(expected_outcome_common_neighbors))
-        self.assertEqual(type(rec), type(expected_outcome_common_neighbors))
+        self.assertIsInstance(rec, Mapping)
         self.assertCountEqual(rec, expected_outcome_common_neighbors)
 
         kn_obj_2 = Recommendations(self.friend_dict)
         kn_obj_2.find_recommendations(score='jaccard')
         rec = kn_obj_2.recommendations
         self.assertEqual(len(rec), len(expected_outcome_jaccard))
-        self.assertEqual(type(rec), type(expected_outcome_jaccard))
+        self.assertIsInstance(rec, Mapping)
         self.assertCountEqual(rec, expected_outcome_jaccard)
 
         kn_obj_3 = Recommendations(self.friend_dict)
         kn_obj_3.find_recommendations(score='adamic_adar')
         rec = kn_obj_3.recommendations
         self.assertEqual(len(rec), len(expected_outcome_a_a))
-        self.assertEqual(type(rec), type(expected_outcome_a_a))
+        self.assertIsInstance(rec, Mapping)
         self.assertCountEqual(rec, expected_outcome_a_a)
+
+    def test_recommendation_table(self):
+        table = RecommendationTable(2, ['1', '0'])
+        table['0'] = [('2', 2.5), ('4', 1), ('5', 1)]
+        table['1'] = [('4', 0.2)]
+
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table['0'], [('2', 2.5), ('4', 1)])
+        self.assertEqual(table['1'], [('4', 0.2)])
+        self.assertEqual([table.node(row) for row in range(4)], ['0', '1', '2', '4'])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'recommendations.bin')
+            table.save(file_name)
+            loaded = RecommendationTable.load(file_name)
+
+        self.assertEqual(loaded, table)
+        self.assertEqual(loaded.find('4'), 3)
+        self.assertNotIn('2', table)
+
+        del table['0']
+        self.assertEqual(list(table), ['1'])
+        self.assertRaises(KeyError, table.__getitem__, '0')
+
+    def test_recommendation_table_integer_scores(self):
+        rec_obj = Recommendations(self.friend_dict)
+        rec_obj.find_recommendations(score='common_neighbors')
+
+        self.assertEqual(rec_obj.recommendations['0'], [('2', 2), ('4', 1)])
+        self.assertIsInstance(rec_obj.recommendations['0'][0][1], int)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'recommendations.bin')
+            rec_obj.recommendations.save(file_name)
+            loaded = RecommendationTable.load(file_name)
+
+        self.assertEqual(loaded.score, 'common_neighbors')
+        self.assertIsInstance(loaded['0'][0][1], int)
+
+    def test_recommendation_table_export(self):
+        rec_obj = Recommendations(self.friend_dict)
+        rec_obj.find_recommendations(score='jaccard')
+        table = rec_obj.recommendations
+
+        ids, scores, mask = table.to_numpy()
+        self.assertEqual(ids.shape, (len(self.friend_dict), rec_obj.number_of_suggestions))
+        self.assertEqual(str(scores.dtype), 'float32')
+        self.assertEqual(mask.sum(), sum(len(suggestions) for suggestions in table.values()))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'recommendations.bin')
+            table.save(file_name)
+            loaded = RecommendationTable.load(file_name)
+
+        self.assertEqual(loaded, table)
+
+    def test_run_adamin_adar_single_friend_common_neighbor(self):
+        # '2' lists a single friend, as in an asymmetric edge list
+        rec_obj = Recommendations({'0': {'1', '2'}, '1': {'0'}, '2': {'3'}, '3': {'2'}})
+
+        self.assertEqual(rec_obj.run_adamin_adar('0', '3'), 0)
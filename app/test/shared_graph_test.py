@@ -0,0 +1,191 @@
+from app.recommendations import Recommendations
+from app.shared_graph import GraphPublisher, SharedGraph
+
+import gc
+import math
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import textwrap
+import tracemalloc
+import unittest
+
+
+class SharedGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.friend_dict = {'0': {'1', '3'},
+                            '1': {'0', '2', '3'},
+                            '2': {'1', '3'},
+                            '3': {'0', '1', '2', '4'},
+                            '4': {'3', '5', '6'},
+                            '5': {'4', '6'},
+                            '6': {'4', '5'}}
+
+        self.publisher = GraphPublisher('friends_test_{}'.format(os.getpid()))
+        self.publisher.publish(self.friend_dict)
+        self.shared = SharedGraph(self.publisher.name)
+
+    def tearDown(self):
+        self.shared.close()
+        self.publisher.close()
+
+    def test_shared_graph_matches_friend_dict(self):
+        self.assertEqual(len(self.shared), len(self.friend_dict))
+        self.assertCountEqual(self.shared, self.friend_dict)
+        for node, friends in self.friend_dict.items():
+            self.assertEqual(self.shared[node], friends)
+            self.assertEqual(self.shared.degree(node), len(friends))
+        self.assertNotIn('7', self.shared)
+        self.assertAlmostEqual(self.shared.adamic_adar_weight('3'), 1 / math.log(4))
+
+    def test_find_recommendations_over_shared_graph(self):
+        for score in ['common_neighbors', 'jaccard', 'adamic_adar', 'cosine']:
+            expected = Recommendations(self.friend_dict)
+            expected.find_recommendations(score=score)
+            shared = Recommendations(self.shared)
+            shared.find_recommendations(score=score)
+
+            self.assertEqual(shared.recommendations, expected.recommendations)
+
+    def test_adamic_adar_uses_weight_table(self):
+        rec_obj = Recommendations(self.shared)
+        expected = Recommendations(self.friend_dict)
+
+        for node, candidate_node in [('0', '2'), ('0', '4'), ('3', '5'), ('1', '4')]:
+            self.assertEqual(rec_obj.run_adamin_adar(node, candidate_node),
+                             expected.run_adamin_adar(node, candidate_node))
+
+    def test_run_algorithm_over_shared_tables(self):
+        rec_obj = Recommendations(self.shared)
+        expected = Recommendations(self.friend_dict)
+
+        for score in ['common_neighbors', 'jaccard', 'adamic_adar', 'cosine']:
+            for node in self.friend_dict:
+                self.assertEqual(self.shared.run_algorithm(node, score), expected.run_algorithm(node, score))
+                self.assertEqual(rec_obj.run_algorithm(node, score, limit=1), expected.run_algorithm(node, score)[:1])
+        self.assertRaises(KeyError, self.shared.run_algorithm, '7', 'jaccard')
+
+    def test_worker_memory_below_dict_copy(self):
+        generator = random.Random(0)
+        nodes = [str(i) for i in range(500)]
+        friend_dict = {node: set() for node in nodes}
+        for _ in range(3000):
+            node_a, node_b = generator.sample(nodes, 2)
+            friend_dict[node_a].add(node_b)
+            friend_dict[node_b].add(node_a)
+        self.publisher.publish(friend_dict)
+        data = pickle.dumps(friend_dict)
+
+        def worker_memory(load):
+            # memory that a serving worker still holds after recommending for every node
+            gc.collect()
+            tracemalloc.start()
+            graph = load()
+            rec_obj = Recommendations(graph)
+            for node in friend_dict:
+                rec_obj.run_algorithm(node, 'jaccard', limit=10)
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            if isinstance(graph, SharedGraph):
+                graph.close()
+
+            return retained
+
+        dict_memory = worker_memory(lambda: pickle.loads(data))
+        shared_memory = worker_memory(lambda: SharedGraph(self.publisher.name))
+
+        self.assertLess(shared_memory * 20, dict_memory,
+                        'worker memory: shared {} bytes, dict copy {} bytes'.format(shared_memory, dict_memory))
+
+    def test_shared_graph_is_read_only(self):
+        rec_obj = Recommendations(self.shared)
+
+        self.assertRaises(TypeError, rec_obj.add_edge, '0', '2')
+        self.assertRaises(TypeError, rec_obj.remove_edge, '0', '1')
+        self.assertRaises(TypeError, rec_obj.evaluate_scoring_functions)
+        self.assertNotIn('2', self.shared['0'])
+        self.assertIn('1', self.shared['0'])
+
+    def test_worker_process_exit_keeps_graph(self):
+        app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        worker = ('import sys; sys.path.insert(0, {!r}); from shared_graph import SharedGraph; '
+                  'graph = SharedGraph({!r}); print(" ".join(sorted(graph["3"]))); graph.close()'
+                  .format(app_dir, self.publisher.name))
+
+        for _ in range(2):
+            output = subprocess.run([sys.executable, '-c', worker], capture_output=True, text=True, check=True)
+
+            self.assertEqual(output.stdout.split(), ['0', '1', '2', '4'])
+            self.assertNotIn('leaked', output.stderr)
+
+        other = SharedGraph(self.publisher.name)
+        self.assertEqual(other['3'], self.friend_dict['3'])
+        other.close()
+
+    def test_multiprocessing_workers_refresh(self):
+        app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = textwrap.dedent('''
+            import multiprocessing
+            import sys
+
+            sys.path.insert(0, {!r})
+            from shared_graph import GraphPublisher, SharedGraph
+
+            graph = None
+
+
+            def attach(name):
+                global graph
+                graph = SharedGraph(name)
+
+
+            def friends(node):
+                graph.refresh()
+                return graph.version, ' '.join(sorted(graph[node]))
+
+
+            if __name__ == '__main__':
+                method, name = sys.argv[1:]
+                friend_dict = {{'0': {{'1'}}, '1': {{'0', '2'}}, '2': {{'1'}}}}
+                publisher = GraphPublisher(name)
+                publisher.publish(friend_dict)
+
+                pool = multiprocessing.get_context(method).Pool(2, initializer=attach, initargs=(name,))
+                print(sorted(set(pool.map(friends, ['0'] * 8))))
+                friend_dict['0'].add('2')
+                friend_dict['2'].add('0')
+                publisher.publish(friend_dict)
+                print(sorted(set(pool.map(friends, ['0'] * 8))))
+                pool.close()
+                pool.join()
+                publisher.close()
+            ''').format(app_dir)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'workers.py')
+            with open(file_name, 'w') as fp:
+                fp.write(script)
+
+            for method in ['fork', 'spawn']:
+                name = 'friends_pool_{}_{}'.format(method, os.getpid())
+                output = subprocess.run([sys.executable, file_name, method, name], capture_output=True,
+                                        text=True, check=True)
+
+                self.assertEqual(output.stdout.splitlines(), ["[(1, '1')]", "[(2, '1 2')]"], method)
+                for message in ['Traceback', 'KeyError', 'leaked']:
+                    self.assertNotIn(message, output.stderr, method)
+
+    def test_refresh_attaches_new_version(self):
+        self.assertFalse(self.shared.refresh())
+
+        self.friend_dict['0'].add('2')
+        self.friend_dict['2'].add('0')
+        self.publisher.publish(self.friend_dict)
+
+        self.assertTrue(self.shared.refresh())
+        self.assertEqual(self.shared.version, 2)
+        self.assertEqual(self.shared['0'], {'1', '2', '3'})